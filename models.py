@@ -66,7 +66,7 @@ class Model(object):
                                           deterministic=False))
         n_samples = len(inputs[0])
         n_out = self.net.values()[-1].output_shape[1]
-        mc_samples = np.zeros((n_samples, n_out, T))
+        mc_samples = np.empty((n_samples, n_out, T))
         for t in range(T):
             mc_samples[:, :, t] = self._predict_stoch(*inputs)
         return mc_samples
@@ -3,30 +3,43 @@
    classified"""
 from __future__ import print_function
 from collections import OrderedDict
+import functools
 import h5py
+import matplotlib
+# figures are only written to files, the non-interactive backend avoids the
+# overhead of a GUI event loop (has to be selected before importing pyplot)
+matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 import matplotlib.image as mpimg
 import numpy as np
 import cPickle as pickle
 import os
 import pandas as pd
+from pathos import multiprocessing
 import seaborn as sns
 from sklearn.metrics import roc_auc_score
-import statsmodels.nonparametric.api as smnp
 
 from util import roc_curve_plot
 from util import bootstrap
+from util import bootstrap_batched
+from util import roc_auc_batched
+from util import roc_auc_prefixes
+from util import rowwise
 from util import balance_classes
+from util import gaussian_kde_fft
+from util import gaussian_kde2d_fft
 
 from matplotlib import rcParams
 rcParams.update({'figure.autolayout': True})
 
-plt.ion()
 sns.set_context('paper', font_scale=1.5)
 sns.set_style('whitegrid')
 
 FIGURE_WIDTH = 8.27  # 8.27 inch corresponds to A4
 
+# shared by all bootstrap estimates to make figures reproducible
+RANDOM_STATE = np.random.RandomState(1234)
+
 TAG = {0: 'healthy', 1: 'diseased'}
 ONSET_TAG = {1: 'mild DR', 2: 'moderate DR'}
 
@@ -129,25 +142,82 @@ CONFIG = {
 }
 
 
+def memoize(fun):
+    """Cache the return values of fun by its (hashable) positional arguments
+
+    functools.lru_cache is not available in python 2. Cached values are shared
+    between callers and must not be modified in place.
+
+    """
+    cache = {}
+
+    @functools.wraps(fun)
+    def wrapper(*args):
+        if args not in cache:
+            cache[args] = fun(*args)
+        return cache[args]
+
+    return wrapper
+
+
+@memoize
+def read_labels_file(labels_file):
+    """Image names and disease levels (as int8) of labels_file
+
+    Parsed once and shared by load_labels and load_filenames.
+
+    """
+    return pd.read_csv(labels_file, usecols=['image', 'level'],
+                       dtype={'level': np.int8})
+
+
 def load_labels(labels_file):
-    df_test = pd.read_csv(labels_file)
-    y_test = df_test.level.values
-    return y_test
+    return read_labels_file(labels_file).level.values
 
 
 def load_filenames(labels_file):
-    df_test = pd.read_csv(labels_file)
-    return df_test.image.values
+    return read_labels_file(labels_file).image.values
+
+
+def save_atomic(filename, array):
+    """np.save array to filename via a temporary file in the same directory
 
+    The complete file is renamed into place, so an interrupted run never
+    leaves a truncated file behind that looks up to date.
 
+    """
+    tmp_file = filename + '.tmp'
+    with open(tmp_file, 'wb') as f:
+        np.save(f, array)
+    os.rename(tmp_file, filename)
+
+
+@memoize
 def load_predictions(filename):
-    """Load test predictions obtained with scripts/predict.py"""
-    with open(filename, 'rb') as h:
-        pred_test = pickle.load(h)
-    probs = pred_test['det_out']
-    probs_mc = pred_test['stoch_out']
-    assert ((0.0 <= probs) & (probs <= 1.0 + 1e-6)).all()
-    assert ((0.0 <= probs_mc) & (probs_mc <= 1.0 + 1e-6)).all()
+    """Load test predictions obtained with scripts/predict.py
+
+    The pickled arrays are converted once to float32 .npy files next to
+    filename, which are memory-mapped instead of unpickled on subsequent
+    runs.
+
+    """
+    det_file = filename + '.det.npy'
+    stoch_file = filename + '.stoch.npy'
+    if not all(os.path.exists(f) and
+               os.path.getmtime(f) >= os.path.getmtime(filename)
+               for f in [det_file, stoch_file]):
+        with open(filename, 'rb') as h:
+            pred_test = pickle.load(h)
+        save_atomic(det_file,
+                    pred_test['det_out'].astype(np.float32, copy=False))
+        save_atomic(stoch_file,
+                    pred_test['stoch_out'].astype(np.float32, copy=False))
+    # no-op for float32 files, the memory map is kept in that case
+    probs = np.load(det_file, mmap_mode='r').astype(np.float32, copy=False)
+    probs_mc = np.load(stoch_file, mmap_mode='r').astype(np.float32,
+                                                         copy=False)
+    assert probs.min() >= 0.0 and probs.max() <= 1.0 + 1e-5
+    assert probs_mc.min() >= 0.0 and probs_mc.max() <= 1.0 + 1e-5
     return probs, probs_mc
 
 
@@ -164,16 +234,13 @@ def load_predictions_gp(filename):
 
 
 def binary_labels(labels, min_positive_level=1):
-    labels_bin = np.zeros_like(labels)
-    labels_bin[labels < min_positive_level] = 0
-    labels_bin[labels >= min_positive_level] = 1
-    return labels_bin
+    return (labels >= min_positive_level).view(np.int8)
 
 
 def binary_probs(probs, min_positive_level=1):
     n_classes = probs.shape[1]
     if n_classes == 5:
-        return probs[:, min_positive_level:].sum(axis=1)
+        return probs[:, min_positive_level:].sum(axis=1, dtype=np.float32)
     elif n_classes == 2:
         return np.squeeze(probs[:, 1:])
     else:
@@ -192,26 +259,54 @@ def detection_task(y, probs, probs_mc, disease_level):
     return y_diseased, probs_diseased, probs_mc_diseased
 
 
-def mode(data):
-    """Compute a kernel density estimate and return the mode"""
+def mode(data, max_bins=64):
+    """Return the center of the most populated histogram bin of data"""
     if len(np.unique(data)) == 1:
         return data[0]
     else:
-        kde = smnp.KDEUnivariate(data.astype('double'))
-        kde.fit(cut=0)
-        grid, y = kde.support, kde.density
-        return grid[y == y.max()][0]
+        hist, edges = np.histogram(data, bins=max(1, min(max_bins,
+                                                         len(data) // 2)))
+        i = hist.argmax()
+        return (edges[i] + edges[i + 1]) / 2.0
 
 
 def posterior_statistics(probs_mc_bin):
-    predictive_mean = probs_mc_bin.mean(axis=1)
-    predictive_std = probs_mc_bin.std(axis=1)
-    assert (0.0 <= predictive_std).all()
+    """Predictive mean and standard deviation over the MC samples (axis 1)
+
+    Both are derived from the first two raw moments, which avoids the
+    temporary copy of probs_mc_bin that ndarray.std allocates.
+
+    """
+    n_mc = probs_mc_bin.shape[1]
+    predictive_mean = probs_mc_bin.sum(axis=1, dtype=np.float64) / n_mc
+    mean_sq = np.einsum('ij,ij->i', probs_mc_bin, probs_mc_bin,
+                        dtype=np.float64) / n_mc
+    # clipping guards against tiny negative variances from rounding
+    predictive_std = np.sqrt(np.maximum(mean_sq - predictive_mean ** 2, 0.0))
     return predictive_mean, predictive_std
 
 
+@memoize
+def get_task(config_key):
+    """Labels, predictions and posterior statistics for CONFIG[config_key]
+
+    Returns
+    =======
+
+    y, y_bin, probs_bin, probs_mc_bin, pred_mean, pred_std
+
+    """
+    config = CONFIG[config_key]
+    y = load_labels(config['LABELS_FILE'])
+    probs, probs_mc = load_predictions(config['predictions'])
+    y_bin, probs_bin, probs_mc_bin = detection_task(y, probs, probs_mc,
+                                                    config['disease_onset'])
+    pred_mean, pred_std = posterior_statistics(probs_mc_bin)
+    return y, y_bin, probs_bin, probs_mc_bin, pred_mean, pred_std
+
+
 def argmax_labels(probs):
-    return (probs >= 0.5).astype(int)
+    return (probs >= 0.5).view(np.int8)
 
 
 def accuracy(y_true, probs):
@@ -241,65 +336,155 @@ def contralateral_agreement(y, config):
         raise TypeError('Laterality not defined for %s'
                         % config['LABELS_FILE'])
 
-    df = pd.read_csv(config['LABELS_FILE'])
-    left = df.image.str.contains(r'\d+_left').values
-    right = df.image.str.contains(r'\d+_right').values
+    images = load_filenames(config['LABELS_FILE']).astype(str)
+    patient = np.char.rpartition(images, '_')[:, 0]
+    _, patient_idx = np.unique(patient, return_inverse=True)
+
+    # smallest and largest label of every patient, agreement if equal
+    order = np.argsort(patient_idx, kind='mergesort')
+    start = np.concatenate(
+        ([0], np.flatnonzero(np.diff(patient_idx[order])) + 1))
+    y_min = np.minimum.reduceat(y[order], start)
+    y_max = np.maximum.reduceat(y[order], start)
+    return (y_min == y_max)[patient_idx]
+
+
+def mean_batched(x):
+    """Row means of (n_batch, n_samples) x, see util.bootstrap_batched"""
+    return x.mean(axis=1)
+
+
+# vectorized counterparts of the measures, see util.bootstrap_batched
+BATCHED_MEASURES = {roc_auc_score: roc_auc_batched,
+                    np.mean: mean_batched}
 
-    accepted_patients = (y[left] == y[right])
-    accepted_images_left = df[left].image[accepted_patients]
-    accepted_images_right = df[right].image[accepted_patients]
-    accepted_images = pd.concat((accepted_images_left,
-                                 accepted_images_right))
-    return df.image.isin(accepted_images).values
+
+def confidence_interval(data, measure, n_resamples, alpha=0.05,
+                        n_draws=None):
+    """Bootstrap confidence interval, vectorized over resamples if possible
+
+    Resamples of size n_draws (default: all samples) for other measures than
+    BATCHED_MEASURES are evaluated one after the other.
+
+    """
+    if measure in BATCHED_MEASURES:
+        return bootstrap_batched(data, BATCHED_MEASURES[measure],
+                                 n_resamples=n_resamples, alpha=alpha,
+                                 random_state=RANDOM_STATE, n_draws=n_draws)
+    if n_draws is not None:
+        return bootstrap_batched(data, rowwise(measure),
+                                 n_resamples=n_resamples, alpha=alpha,
+                                 random_state=RANDOM_STATE, n_draws=n_draws)
+    low, high = bootstrap(data, measure, n_resamples=n_resamples, alpha=alpha)
+    return low.value, high.value
+
+
+def prefix_performance(data, measure, cuts):
+    """measure(*[d[:cut] for d in data]) for all cuts
+
+    Means are obtained for all prefixes from one cumulative sum, roc auc by
+    incrementally updating the Mann-Whitney statistic.
+
+    """
+    if measure is np.mean:
+        return np.cumsum(data[0])[cuts - 1] / cuts.astype(float)
+    if measure is roc_auc_score:
+        return roc_auc_prefixes(data[0], data[1], cuts)
+    return np.array([measure(*[d[:cut] for d in data]) for cut in cuts])
 
 
 def performance_over_uncertainty_tol(uncertainty, y, probs, measure,
-                                     min_percentile, n_bootstrap):
+                                     min_percentile, n_bootstrap,
+                                     y_pred=None):
+    """Performance on the data retained at increasing uncertainty tolerances
+
+    y_pred (argmax_labels(probs)) can be passed along with measure accuracy
+    if it is already known to the caller.
 
-    uncertainty_tol, frac_retain, accept_idx = \
-        sample_rejection(uncertainty, min_percentile)
+    """
+    if measure is accuracy:
+        # Accuracy only depends on which predictions are correct. This is
+        # determined once, prefixes and resamples then only need means.
+        if y_pred is None:
+            y_pred = argmax_labels(probs)
+        data, measure = [(y_pred == y).astype(np.int8)], np.mean
+    else:
+        data = [y, probs]
+
+    # Accepted samples at any tolerance are a prefix of the samples sorted by
+    # uncertainty, which turns the selection into contiguous slices.
+    order = np.argsort(uncertainty, kind='mergesort')
+    u_s = uncertainty[order]
+    data_s = [d[order] for d in data]
+    n_samples = len(uncertainty)
+
+    uncertainty_tol = rejection_tolerances(u_s, min_percentile,
+                                           is_sorted=True)
+    cuts = np.searchsorted(u_s, uncertainty_tol, side='right')
+    frac_retain = cuts / float(n_samples)
 
-    p = np.zeros((len(uncertainty_tol),), dtype=[('value', 'float64'),
-                                                 ('low', 'float64'),
-                                                 ('high', 'float64')])
-    p_rand = np.zeros((len(uncertainty_tol),), dtype=[('value', 'float64'),
-                                                      ('low', 'float64'),
-                                                      ('high', 'float64')])
+    # one contiguous block for both curves, every field is overwritten below
+    p, p_rand = np.empty((2, len(uncertainty_tol)),
+                         dtype=[('value', 'float64'),
+                                ('low', 'float64'),
+                                ('high', 'float64')])
 
-    for i, ut in enumerate(uncertainty_tol):
-        accept = accept_idx[i]
-        rand_sel = np.random.permutation(accept)
+    # Random referral retains a random subset of the samples, its expected
+    # performance is the one on all data. Only the confidence interval
+    # depends on the number of retained samples.
+    p_rand['value'] = measure(*data)
+    p['value'] = prefix_performance(data_s, measure, cuts)
 
-        low, high = bootstrap([y[accept], probs[accept]], measure,
-                              n_resamples=n_bootstrap, alpha=0.05)
+    for i, cut in enumerate(cuts):
+        low, high = confidence_interval([d[:cut] for d in data_s], measure,
+                                        n_resamples=n_bootstrap)
 
-        p['value'][i] = measure(y[accept], probs[accept])
-        p['low'][i] = low.value
-        p['high'][i] = high.value
+        p['low'][i] = low
+        p['high'][i] = high
 
-        low, high = bootstrap([y[rand_sel], probs[rand_sel]], measure,
-                              n_resamples=100, alpha=0.05)
+        low, high = confidence_interval(data, measure,
+                                        n_resamples=100, n_draws=cut)
 
-        p_rand['value'][i] = measure(y[rand_sel], probs[rand_sel])
-        p_rand['low'][i] = low.value
-        p_rand['high'][i] = high.value
+        p_rand['low'][i] = low
+        p_rand['high'][i] = high
 
     return uncertainty_tol, frac_retain, p, p_rand
 
 
+def rejection_tolerances(uncertainty, min_percentile, maximum=None,
+                         is_sorted=False):
+    """100 tolerances from the min_percentile of uncertainty to maximum
+
+    If uncertainty is already sorted (is_sorted=True), the percentile
+    (linearly interpolated as in np.percentile) and the maximum are read off
+    directly instead of being computed by separate passes.
+
+    """
+    if not is_sorted:
+        if maximum is None:
+            maximum = uncertainty.max()
+        return np.linspace(np.percentile(uncertainty, min_percentile),
+                           maximum, 100)
+
+    if maximum is None:
+        maximum = uncertainty[-1]
+    pos = min_percentile / 100.0 * (len(uncertainty) - 1)
+    lo = int(pos)
+    hi = min(lo + 1, len(uncertainty) - 1)
+    minimum = uncertainty[lo] + \
+        (pos - lo) * (uncertainty[hi] - uncertainty[lo])
+    return np.linspace(minimum, maximum, 100)
+
+
 def sample_rejection(uncertainty, min_percentile,
                      maximum=None):
-    if maximum is None:
-        maximum = uncertainty.max()
-    uncertainty_tol = np.linspace(np.percentile(uncertainty, min_percentile),
-                                  maximum, 100)
-    frac_retain = np.zeros_like(uncertainty_tol)
-    n_samples = len(uncertainty)
-    accept_indices = []
-    for i, ut in enumerate(uncertainty_tol):
-        accept = (uncertainty <= ut)
-        accept_indices.append(accept)
-        frac_retain[i] = accept.sum() / float(n_samples)
+    uncertainty_tol = rejection_tolerances(uncertainty, min_percentile,
+                                           maximum)
+    # accept_indices[i] is the boolean mask of samples with
+    # uncertainty <= uncertainty_tol[i], shape (len(uncertainty_tol), n)
+    accept_indices = (uncertainty[np.newaxis, :] <=
+                      uncertainty_tol[:, np.newaxis])
+    frac_retain = accept_indices.mean(axis=1)
 
     return uncertainty_tol, frac_retain, accept_indices
 
@@ -317,22 +502,20 @@ def acc_rejection_figure(y, y_score, uncertainties, config,
     ax121.set_title('(a)')
     ax122.set_title('(b)')
 
+    y_pred = argmax_labels(y_score)
     min_acc = 1.0
     for i, (k, v) in enumerate(uncertainties.iteritems()):
         v_tol, frac_retain, acc, acc_rand = \
             performance_over_uncertainty_tol(v, y, y_score, accuracy, 0.0,
-                                             config['n_bootstrap'])
+                                             config['n_bootstrap'],
+                                             y_pred=y_pred)
         ax121.plot(v_tol, acc['value'],
                    label=k, color=colors[i], linewidth=2)
         ax122.plot(frac_retain, acc['value'],
                    label=k, color=colors[i], linewidth=2)
-        ax121.fill_between(v_tol, acc['value'], acc['low'],
-                           color=colors[i], alpha=0.3)
-        ax121.fill_between(v_tol, acc['high'], acc['value'],
-                           color=colors[i], alpha=0.3)
-        ax122.fill_between(frac_retain, acc['value'], acc['low'],
+        ax121.fill_between(v_tol, acc['low'], acc['high'],
                            color=colors[i], alpha=0.3)
-        ax122.fill_between(frac_retain, acc['high'], acc['value'],
+        ax122.fill_between(frac_retain, acc['low'], acc['high'],
                            color=colors[i], alpha=0.3)
         if min_acc > min(min(acc['low']), min(acc_rand['low'])):
             min_acc = min(min(acc['low']), min(acc_rand['low']))
@@ -346,9 +529,7 @@ def acc_rejection_figure(y, y_score, uncertainties, config,
 
     ax122.plot(frac_retain, acc_rand['value'], label='random referral',
                color=colors[i+1], linewidth=2)
-    ax122.fill_between(frac_retain, acc_rand['value'], acc_rand['low'],
-                       color=colors[i+1], alpha=0.3)
-    ax122.fill_between(frac_retain, acc_rand['high'], acc_rand['value'],
+    ax122.fill_between(frac_retain, acc_rand['low'], acc_rand['high'],
                        color=colors[i+1], alpha=0.3)
     ax122.set_xlabel('retained data')
     ax122.legend(loc='best')
@@ -368,9 +549,12 @@ def level_subplot(y_level, uncertainty, config,
                   ax=None):
     tol, frac_retain, accept_idx = sample_rejection(uncertainty, 0)
     LEVEL = config['LEVEL']
-    p = {level: np.array([rel_freq(y_level[~accept], level)
-                          for accept in accept_idx])
-         for level in LEVEL}
+    # counts of each level among the referred samples for all tolerances
+    onehot = (y_level[:, np.newaxis] ==
+              np.array(list(LEVEL.keys()))).astype(np.float32)
+    reject = (~accept_idx).astype(np.float32)
+    rel = reject.dot(onehot) / reject.sum(axis=1, keepdims=True)
+    p = {level: rel[:, j] for j, level in enumerate(LEVEL)}
     cum = np.zeros_like(tol)
 
     with sns.axes_style('white'):
@@ -402,11 +586,7 @@ def level_figure():
     fig = plt.figure(figsize=(FIGURE_WIDTH, FIGURE_WIDTH / 2.0))
     for i, k in enumerate(keys):
         config = CONFIG[k]
-        y = load_labels(config['LABELS_FILE'])
-        probs, probs_mc = load_predictions(config['predictions'])
-        _, _, probs_mc_bin = detection_task(y, probs, probs_mc,
-                                            config['disease_onset'])
-        _, pred_std = posterior_statistics(probs_mc_bin)
+        y, _, _, _, _, pred_std = get_task(k)
 
         ax = fig.add_subplot(1, 2, i + 1)
         level_subplot(y, pred_std, config, ax=ax)
@@ -426,10 +606,10 @@ def label_disagreement_subplot(y, uncertainty, config, ax=None):
 
     tol, frac_retain, accept_idx = sample_rejection(uncertainty, 0.1)
 
-    p_referred = np.array([sum((~accept) & (disagreeing)) / float(sum(~accept))
-                           for accept in accept_idx])
-    p_retained = np.array([sum((accept) & (disagreeing)) / float(sum(accept))
-                           for accept in accept_idx])
+    p_referred = ((~accept_idx) & disagreeing).sum(axis=1) / \
+        (~accept_idx).sum(axis=1).astype(float)
+    p_retained = (accept_idx & disagreeing).sum(axis=1) / \
+        accept_idx.sum(axis=1).astype(float)
 
     with sns.axes_style('white'):
         ax.fill_between(tol, p_referred, 0, alpha=0.5,
@@ -454,11 +634,7 @@ def label_disagreement_figure():
 
     for i, k in enumerate(keys):
         config = CONFIG[k]
-        y = load_labels(config['LABELS_FILE'])
-        probs, probs_mc = load_predictions(config['predictions'])
-        y_bin, _, probs_mc_bin = detection_task(y, probs, probs_mc,
-                                                config['disease_onset'])
-        _, pred_std = posterior_statistics(probs_mc_bin)
+        _, y_bin, _, _, _, pred_std = get_task(k)
 
         ax = fig.add_subplot(1, 2, i + 1)
         label_disagreement_subplot(y_bin, pred_std, config, ax=ax)
@@ -470,9 +646,44 @@ def label_disagreement_figure():
     return {'label_disagreement': fig}
 
 
+def roc_auc_curves(y, y_score, uncertainties, config, cache_names=None):
+    """Auc over tolerated uncertainty, cached in data/processed
+
+    cache_names maps the keys of uncertainties to the names of their cache
+    files (default: the keys themselves). Figures that show the same curve
+    under a different label share it this way.
+
+    Returns
+    =======
+
+    dict with (v_tol, frac_retain, auc, auc_rand) for each uncertainty
+
+    """
+    curves = {}
+    for k, v in uncertainties.iteritems():
+        cache_name = k if cache_names is None else cache_names[k]
+        filename = 'data/processed/bt' + str(config['n_bootstrap']) + '_' + \
+            cache_name.replace(' ', '') + '_' + config['net'] + '_' + \
+            str(config['disease_onset']) + '_' + config['dataset'] + '.npz'
+        if os.path.exists(filename):
+            data = np.load(filename)
+            v_tol, frac_retain, auc, auc_rand = data['v_tol'], \
+                data['frac_retain'], data['auc'], data['auc_rand']
+        else:
+            v_tol, frac_retain, auc, auc_rand = \
+                performance_over_uncertainty_tol(v, y, y_score,
+                                                 roc_auc_score,
+                                                 config['min_percentile'],
+                                                 config['n_bootstrap'])
+            np.savez(filename, v_tol=v_tol, frac_retain=frac_retain,
+                     auc=auc, auc_rand=auc_rand)
+        curves[k] = v_tol, frac_retain, auc, auc_rand
+    return curves
+
+
 def roc_auc_subplot(y, y_score, uncertainties, config,
                     save=False, format='.svg',
-                    ax121=None, ax122=None):
+                    ax121=None, ax122=None, curves=None):
     if ax121 is None or ax122 is None:
         fig = plt.figure(figsize=(FIGURE_WIDTH,
                                   FIGURE_WIDTH / 2.0))
@@ -488,28 +699,15 @@ def roc_auc_subplot(y, y_score, uncertainties, config,
                     % (config['net'], ONSET_TAG[config['disease_onset']],
                        config['dataset']))
 
+    if curves is None:
+        curves = roc_auc_curves(y, y_score, uncertainties, config)
+
     for i, (k, v) in enumerate(uncertainties.iteritems()):
-        filename = 'data/processed/bt' + str(config['n_bootstrap']) + '_' + \
-            k.replace(' ', '') + '_' + config['net'] + '_' + \
-            str(config['disease_onset']) + '_' + config['dataset'] + '.npz'
-        if os.path.exists(filename):
-            data = np.load(filename)
-            v_tol, frac_retain, auc, auc_rand = data['v_tol'], \
-                data['frac_retain'], data['auc'], data['auc_rand']
-        else:
-            v_tol, frac_retain, auc, auc_rand = \
-                performance_over_uncertainty_tol(v, y, y_score,
-                                                 roc_auc_score,
-                                                 config['min_percentile'],
-                                                 config['n_bootstrap'])
-            np.savez(filename, v_tol=v_tol, frac_retain=frac_retain,
-                     auc=auc, auc_rand=auc_rand)
+        v_tol, frac_retain, auc, auc_rand = curves[k]
 
         ax121.plot(frac_retain, auc['value'],
                    label=k, color=colors[i], linewidth=2)
-        ax121.fill_between(frac_retain, auc['value'], auc['low'],
-                           color=colors[i], alpha=0.3)
-        ax121.fill_between(frac_retain, auc['high'], auc['value'],
+        ax121.fill_between(frac_retain, auc['low'], auc['high'],
                            color=colors[i], alpha=0.3)
 
         if k == 'MC dropout':
@@ -517,33 +715,27 @@ def roc_auc_subplot(y, y_score, uncertainties, config,
             ax122
             fractions = [0.9, 0.8, 0.7]
             for j, f in enumerate(fractions):
-                thr = v_tol[frac_retain >= f][0]
-                roc_curve_plot(y[v <= thr],
-                               y_score[v <= thr],
+                retained = v <= v_tol[frac_retain >= f][0]
+                roc_curve_plot(y[retained],
+                               y_score[retained],
                                color=colors[j+4],
                                legend_prefix='%d%% data retained, %s'
                                % (f * 100, k),
                                n_bootstrap=config['n_bootstrap'])
         else:
-            # print confidence intervals for table 1
+            # print confidence intervals for table 1, the thresholds are
+            # among v_tol so the values are already part of the auc curve
             fractions = [0.9, 0.8, 0.7]
             for j, f in enumerate(fractions):
-                thr = v_tol[frac_retain >= f][0]
-                low, high = bootstrap([y[v <= thr], y_score[v <= thr]],
-                                      roc_auc_score,
-                                      n_resamples=config['n_bootstrap'],
-                                      alpha=0.05)
-                roc_auc = roc_auc_score(y[v <= thr], y_score[v <= thr])
+                t = np.flatnonzero(frac_retain >= f)[0]
                 msg = '%d%% data retained, %s' % (f * 100, k)
                 msg += ' (auc:%0.3f; CI:%0.3f-%0.3f)' \
-                    % (roc_auc, low.value, high.value)
+                    % (auc['value'][t], auc['low'][t], auc['high'][t])
                 print(msg)
 
     ax121.plot(frac_retain, auc_rand['value'],
                label='random referral', color=colors[i+1], linewidth=2)
-    ax121.fill_between(frac_retain, auc_rand['value'], auc_rand['low'],
-                       color=colors[i+1], alpha=0.3)
-    ax121.fill_between(frac_retain, auc_rand['high'], auc_rand['value'],
+    ax121.fill_between(frac_retain, auc_rand['low'], auc_rand['high'],
                        color=colors[i+1], alpha=0.3)
     ax121.set_xlim(config['min_percentile'] / 100., 1.0)
     ax121.set_xlabel('retained data')
@@ -570,25 +762,36 @@ def roc_auc_subplot(y, y_score, uncertainties, config,
         return {name: fig}
 
 
+def _roc_auc_figure_data(key):
+    """Compute the data for one panel of roc_auc_figure (no plotting)"""
+    config = CONFIG[key]
+    print('Working on %s...' % key)
+    _, y_bin, probs_bin, _, pred_mean, pred_std = get_task(key)
+    probs_gp = load_predictions_gp(config['predictions_gp'])
+    uncertainties = {'MC dropout': pred_std,
+                     'GP': binary_entropy(probs_gp),
+                     'standard dropout': binary_entropy(probs_bin)}
+    curves = roc_auc_curves(y_bin, pred_mean, uncertainties, config)
+    return y_bin, pred_mean, uncertainties, curves
+
+
 def roc_auc_figure():
     keys = ['BCNN_mildDR_Kaggle',
             'BCNN_moderateDR_Kaggle',
             'BCNN_mildDR_Messidor',
             'BCNN_moderateDR_Messidor']
     titles = ['(a)', '(b)', '(c)', '(d)']
+
+    # The configs are independent, only the drawing has to stay in the
+    # main process.
+    pool = multiprocessing.Pool(len(keys))
+    panels = pool.map(_roc_auc_figure_data, keys)
+    pool.terminate()
+
     fig = plt.figure()
-    for i, k in enumerate(keys):
+    for i, (k, panel) in enumerate(zip(keys, panels)):
         config = CONFIG[k]
-        print('Working on %s...' % k)
-        y = load_labels(config['LABELS_FILE'])
-        probs, probs_mc = load_predictions(config['predictions'])
-        y_bin, probs_bin, probs_mc_bin = detection_task(
-            y, probs, probs_mc, config['disease_onset'])
-        pred_mean, pred_std = posterior_statistics(probs_mc_bin)
-        probs_gp = load_predictions_gp(config['predictions_gp'])
-        uncertainties = {'MC dropout': pred_std,
-                         'GP': binary_entropy(probs_gp),
-                         'standard dropout': binary_entropy(probs_bin)}
+        y_bin, pred_mean, uncertainties, curves = panel
 
         ax121 = plt.subplot(2, 4, 2 * i + 1)
         ax122 = plt.subplot(2, 4, 2 * i + 2)
@@ -596,7 +799,8 @@ def roc_auc_figure():
                         uncertainties, config,
                         save=False,
                         ax121=ax121,
-                        ax122=ax122)
+                        ax122=ax122,
+                        curves=curves)
         ax121.set_title('')
         ax121.set_title(titles[i], loc='left')
         ax122.set_title('')
@@ -604,29 +808,23 @@ def roc_auc_figure():
         ax122.set_ylim(0.5, 1.0)
 
     sns.despine(offset=10)
-    plt.tight_layout()
 
     return {'roc_auc': fig}
 
 
-def train_test_generalization():
+def train_test_generalization(save=True, format='.pdf'):
     """Visualizes performance over uncertainty for both train and test data"""
     fig = plt.figure(figsize=(FIGURE_WIDTH / 2.0,
                               FIGURE_WIDTH / 2.0))
     ax = fig.gca()
     colors = sns.color_palette()
 
-    configs = {'$\sigma_{pred} (train)$':
-               CONFIG['BCNN_mildDR_Kaggle_train'],
-               '$\sigma_{pred} (test)$':
-               CONFIG['BCNN_mildDR_Kaggle']}
+    configs = {'$\sigma_{pred} (train)$': 'BCNN_mildDR_Kaggle_train',
+               '$\sigma_{pred} (test)$': 'BCNN_mildDR_Kaggle'}
 
-    for i, (k, config) in enumerate(configs.iteritems()):
-        y = load_labels(config['LABELS_FILE'])
-        probs, probs_mc = load_predictions(config['predictions'])
-        y_bin, probs_bin, probs_mc_bin = detection_task(
-            y, probs, probs_mc, config['disease_onset'])
-        pred_mean, pred_std = posterior_statistics(probs_mc_bin)
+    for i, (k, config_key) in enumerate(configs.iteritems()):
+        config = CONFIG[config_key]
+        _, y_bin, _, _, pred_mean, pred_std = get_task(config_key)
 
         v_tol, _, auc, auc_rand = \
             performance_over_uncertainty_tol(pred_std, y_bin, pred_mean,
@@ -635,9 +833,7 @@ def train_test_generalization():
                                              config['n_bootstrap'])
         ax.plot(v_tol, auc['value'],
                 label=k, color=colors[i], linewidth=2)
-        ax.fill_between(v_tol, auc['value'], auc['low'],
-                        color=colors[i], alpha=0.3)
-        ax.fill_between(v_tol, auc['high'], auc['value'],
+        ax.fill_between(v_tol, auc['low'], auc['high'],
                         color=colors[i], alpha=0.3)
 
     ax.set_xlabel('tolerated model uncertainty [$\sigma_{pred}$]')
@@ -649,11 +845,34 @@ def train_test_generalization():
     name = 'train_test_' + config['net'] + '_' + \
         str(config['disease_onset']) + '_' + config['dataset']
 
-    fig.savefig(name + '.pdf')
+    if save:
+        fig.savefig(name + format)
 
     return {name: fig}
 
 
+def kde_plot(data, ax=None, shade=True, cut=3, label=None, color=None):
+    """Plot a univariate gaussian kde (FFT based) similar to sns.kdeplot"""
+    if ax is None:
+        ax = plt.gca()
+    grid, density = gaussian_kde_fft(data, cut=cut)
+    line, = ax.plot(grid, density, label=label, color=color)
+    if shade:
+        ax.fill_between(grid, density, 0, color=line.get_color(), alpha=0.25)
+    return ax
+
+
+def kde2d_plot(x, y, ax=None, n_levels=10, cut=3):
+    """Plot contours of a bivariate gaussian kde similar to sns.kdeplot"""
+    if ax is None:
+        ax = plt.gca()
+    grid_x, grid_y, density = gaussian_kde2d_fft(x, y, cut=cut)
+    cmap = sns.blend_palette(['#333333'] + sns.color_palette('BuGn_r', 2),
+                             as_cmap=True)
+    ax.contour(grid_x, grid_y, density.T, n_levels, cmap=cmap)
+    return ax
+
+
 def error_conditional_uncertainty(y, y_score, uncertainty, disease_onset,
                                   label='pred_std', ax=None):
     """Plot conditional pdfs for correct and erroneous argmax predictions"""
@@ -664,10 +883,10 @@ def error_conditional_uncertainty(y, y_score, uncertainty, disease_onset,
     corr = (y_pred == y)
     error = (y_pred != y)
 
-    ax = sns.kdeplot(uncertainty[corr], ax=ax, shade=True, cut=0,
-                     label=label + '[corr]')
-    ax = sns.kdeplot(uncertainty[error], ax=ax, shade=True, cut=0,
-                     label=label + '[error]')
+    ax = kde_plot(uncertainty[corr], ax=ax, shade=True, cut=0,
+                  label=label + '[corr]')
+    ax = kde_plot(uncertainty[error], ax=ax, shade=True, cut=0,
+                  label=label + '[error]')
 
     ax.set_xlabel('model uncertainty')
     ax.set_ylabel('density')
@@ -683,40 +902,47 @@ def fig1(y, y_score, images, uncertainty, probs_mc_diseased,
     level = config['LEVEL']
 
     asc = np.argsort(uncertainty)
+    unc_s = uncertainty[asc]
+    y_s = y[asc]
+    y_score_s = y_score[asc]
+    images_s = images[asc]
+    y_level_s = y_level[asc]
+
     certain = 0
     uncertain = len(y) - 1
-    middle_certain = np.where(uncertainty[asc] > 0.14)[0][0]
+    middle_certain = np.searchsorted(unc_s, 0.14, side='right')
     examples = [certain, middle_certain, uncertain]
     fig = plt.figure(figsize=(FIGURE_WIDTH, FIGURE_WIDTH))
 
     for idx, i in enumerate(examples):
-        im = mpimg.imread(os.path.join(image_path, images[asc][i] + '.jpeg'))
+        im = mpimg.imread(os.path.join(image_path, images_s[i] + '.jpeg'))
 
         with sns.axes_style("white"):
             plt.subplot2grid((2, 2 * len(examples)), (0, 2 * idx))
             plt.imshow(im)
             plt.axis('off')
-            title = ['(a)', '(b)', '(c)'][idx] + ' ' + TAG[y[asc][i]]
-            level_info = ' (' + level[y_level[asc][i]] + ')'
+            title = ['(a)', '(b)', '(c)'][idx] + ' ' + TAG[y_s[i]]
+            level_info = ' (' + level[y_level_s[i]] + ')'
             print(title, level_info)
             plt.title(title, loc='left')
 
         ax = plt.subplot2grid((2, 2 * len(examples)), (0, 2 * idx + 1))
-        if uncertainty[asc][i] <= 0.000:
+        if unc_s[i] <= 0.000:
             color = sns.color_palette()[0]
             plt.bar(0.98, 1.0, width=0.02, alpha=0.5, color=color)
             plt.hlines(1.0, 0.98, 1.0, color=color, linewidth=2)
         else:
-            sns.kdeplot(probs_mc_diseased[asc][i], shade=True)
+            # sorting all MC samples would copy the full array
+            kde_plot(probs_mc_diseased[asc[i]], ax=ax, shade=True)
         y_pos = ax.get_ylim()[1] / 2.0
         plt.annotate(['"certain":\n $\sigma_{pred}$ = %.2f'
-                      % uncertainty[asc][i],
+                      % unc_s[i],
                       '"uncertain":\n $\sigma_{pred}$ = %.2f'
-                      % uncertainty[asc][i],
+                      % unc_s[i],
                       '"uncertain":\n $\sigma_{pred}$ = %.2f'
-                      % uncertainty[asc][i]][idx],
+                      % unc_s[i]][idx],
                      (0.2, 0.75 * y_pos))
-        length = 0.5 * max(uncertainty[asc][i], 0.02)
+        length = 0.5 * max(unc_s[i], 0.02)
         arrow_params = {'length_includes_head': True,
                         'width': 0.005 * y_pos,
                         'head_width': 0.05 * y_pos,
@@ -725,7 +951,7 @@ def fig1(y, y_score, images, uncertainty, probs_mc_diseased,
         plt.arrow(0.5, y_pos, -length, 0, **arrow_params)
         plt.xlabel('p(diseased | image)')
         plt.ylabel('density [a.u.]')
-        plt.title('$\mu_{pred}$ = %.2f' % y_score[asc][i], loc='left')
+        plt.title('$\mu_{pred}$ = %.2f' % y_score_s[i], loc='left')
         plt.xlim(0, 1)
         ax.get_yaxis().set_ticks([])
         ax.get_yaxis().set_ticklabels([])
@@ -766,22 +992,22 @@ def prediction_vs_uncertainty(y, uncertainty, prediction,
     plt.suptitle(title)
 
     if ax121 is None:
-        plt.subplot(1, 2, 1)
+        ax121 = plt.subplot(1, 2, 1)
 
     ax121.set_title('(a) correct')
-    sns.kdeplot(prediction[~error], uncertainty[~error],
-                n_levels=n_levels, ax=ax121)
+    kde2d_plot(prediction[~error], uncertainty[~error],
+               n_levels=n_levels, ax=ax121)
     ax121.set_ylabel(ylabel)
     ax121.set_xlabel(xlabel)
     ax121.set_xlim(0, 1.0)
     ax121.set_ylim(0, 0.25)
 
     if ax122 is None:
-        plt.subplot(1, 2, 2)
+        ax122 = plt.subplot(1, 2, 2)
 
     ax122.set_title('(b) error')
-    sns.kdeplot(prediction[error], uncertainty[error],
-                n_levels=n_levels, ax=ax122)
+    kde2d_plot(prediction[error], uncertainty[error],
+               n_levels=n_levels, ax=ax122)
     ax122.set_ylabel(ylabel)
     ax122.set_xlabel(xlabel)
     ax122.set_xlim(0, 1.0)
@@ -792,11 +1018,7 @@ def prediction_vs_uncertainty(y, uncertainty, prediction,
 
 def bayes_vs_softmax():
     config = CONFIG['BCNN_moderateDR_Kaggle']
-    y = load_labels(config['LABELS_FILE'])
-    probs, probs_mc = load_predictions(config['predictions'])
-    y_bin, probs_bin, probs_mc_bin = detection_task(y, probs, probs_mc,
-                                                    config['disease_onset'])
-    _, pred_std = posterior_statistics(probs_mc_bin)
+    _, y_bin, probs_bin, _, _, pred_std = get_task('BCNN_moderateDR_Kaggle')
     uncertainty = {'$\sigma_{pred}$': pred_std}
     prediction = {'p(diseased | image)': probs_bin}
 
@@ -810,11 +1032,8 @@ def bayes_vs_softmax():
 
 def sigma_vs_mu():
     config = CONFIG['BCNN_moderateDR_Kaggle']
-    y = load_labels(config['LABELS_FILE'])
-    probs, probs_mc = load_predictions(config['predictions'])
-    y_bin, probs_bin, probs_mc_bin = detection_task(y, probs, probs_mc,
-                                                    config['disease_onset'])
-    pred_mean, pred_std = posterior_statistics(probs_mc_bin)
+    _, y_bin, probs_bin, _, pred_mean, pred_std = \
+        get_task('BCNN_moderateDR_Kaggle')
     uncertainty = {'$\sigma_{pred}$': pred_std}
     prediction = {'$\mu_{pred}$': pred_mean}
 
@@ -833,24 +1052,23 @@ def sigma_vs_mu():
                                   binary_entropy(pred_mean)),
                                  ('$H(p(diseased|image))$',
                                   binary_entropy(probs_bin))])
-    for i, (k, v) in enumerate(uncertainties.iteritems()):
-        v_tol, frac_retain, auc, auc_rand = \
-            performance_over_uncertainty_tol(v, y_bin, pred_mean,
-                                             roc_auc_score,
-                                             config['min_percentile'],
-                                             config['n_bootstrap'])
+    # sigma_pred and the softmax entropy are the 'MC dropout' and 'standard
+    # dropout' curves of roc_auc_figure, which are reused from its cache
+    curves = roc_auc_curves(y_bin, pred_mean, uncertainties, config,
+                            cache_names={'$\sigma_{pred}$': 'MC dropout',
+                                         '$H(\mu_{pred})$': 'H_mu_pred',
+                                         '$H(p(diseased|image))$':
+                                         'standard dropout'})
+    for i, k in enumerate(uncertainties):
+        v_tol, frac_retain, auc, auc_rand = curves[k]
         ax133.plot(frac_retain, auc['value'],
                    label=k, color=colors[i], linewidth=2)
-        ax133.fill_between(frac_retain, auc['value'], auc['low'],
-                           color=colors[i], alpha=0.3)
-        ax133.fill_between(frac_retain, auc['high'], auc['value'],
+        ax133.fill_between(frac_retain, auc['low'], auc['high'],
                            color=colors[i], alpha=0.3)
 
     ax133.plot(frac_retain, auc_rand['value'],
                label='random referral', color=colors[i + 1], linewidth=2)
-    ax133.fill_between(frac_retain, auc_rand['value'], auc_rand['low'],
-                       color=colors[i + 1], alpha=0.3)
-    ax133.fill_between(frac_retain, auc_rand['high'], auc_rand['value'],
+    ax133.fill_between(frac_retain, auc_rand['low'], auc_rand['high'],
                        color=colors[i + 1], alpha=0.3)
     ax133.set_xlim(config['min_percentile'] / 100., 1.0)
     ax133.set_xlabel('retained data')
@@ -869,12 +1087,8 @@ def sigma_vs_mu():
 
 def gp_figure():
 
-    def load(config_bcnn, config_gp):
-        y = load_labels(config_bcnn['LABELS_FILE'])
-        probs, probs_mc = load_predictions(config_bcnn['predictions'])
-        y_bin, _, probs_mc_bin = detection_task(y, probs, probs_mc,
-                                                config_bcnn['disease_onset'])
-        pred_mean, _ = posterior_statistics(probs_mc_bin)
+    def load(key_bcnn, config_gp):
+        _, y_bin, _, _, pred_mean, _ = get_task(key_bcnn)
 
         probs_gp = load_predictions_gp(config_gp['predictions'])
 
@@ -895,16 +1109,12 @@ def gp_figure():
                                                  n_bootstrap)
             ax.plot(frac_retain, auc['value'],
                     label=k, color=colors[i], linewidth=2)
-            ax.fill_between(frac_retain, auc['value'], auc['low'],
-                            color=colors[i], alpha=0.3)
-            ax.fill_between(frac_retain, auc['high'], auc['value'],
+            ax.fill_between(frac_retain, auc['low'], auc['high'],
                             color=colors[i], alpha=0.3)
 
         ax.plot(frac_retain, auc_rand['value'],
                 label='random referral', color=colors[i + 1], linewidth=2)
-        ax.fill_between(frac_retain, auc_rand['value'], auc_rand['low'],
-                        color=colors[i + 1], alpha=0.3)
-        ax.fill_between(frac_retain, auc_rand['high'], auc_rand['value'],
+        ax.fill_between(frac_retain, auc_rand['low'], auc_rand['high'],
                         color=colors[i + 1], alpha=0.3)
         ax.set_xlim(min_percentile / 100., 1.0)
         ax.set_xlabel('retained data')
@@ -915,7 +1125,7 @@ def gp_figure():
 
     ax221 = plt.subplot(221)
     ax221.set_title('(a) Disease onset: mild DR')
-    y, probs_bcnn, probs_gp = load(CONFIG['BCNN_mildDR_Kaggle'],
+    y, probs_bcnn, probs_gp = load('BCNN_mildDR_Kaggle',
                                    CONFIG['GP_mildDR_Kaggle'])
     auc_plot(y, probs_bcnn, probs_gp, ax=ax221,
              min_percentile=DATA['KaggleDR']['min_percentile'],
@@ -923,14 +1133,14 @@ def gp_figure():
 
     ax223 = plt.subplot(223)
     ax223.set_title('(c) Disease onset: mild DR')
-    sns.kdeplot(binary_entropy(probs_bcnn), binary_entropy(probs_gp),
-                n_levels=250, ax=ax223)
+    kde2d_plot(binary_entropy(probs_bcnn), binary_entropy(probs_gp),
+               n_levels=250, ax=ax223)
     ax223.set_ylabel('GP uncertainty [$H(p_{GP})$]')
     ax223.set_xlabel('BCNN uncertainty [$H(\mu_{pred})$]')
 
     ax222 = plt.subplot(222)
     ax222.set_title('(b) Disease onset: moderate DR')
-    y, probs_bcnn, probs_gp = load(CONFIG['BCNN_moderateDR_Kaggle'],
+    y, probs_bcnn, probs_gp = load('BCNN_moderateDR_Kaggle',
                                    CONFIG['GP_moderateDR_Kaggle'])
     auc_plot(y, probs_bcnn, probs_gp, ax=ax222,
              min_percentile=DATA['KaggleDR']['min_percentile'],
@@ -938,8 +1148,8 @@ def gp_figure():
 
     ax224 = plt.subplot(224)
     ax224.set_title('(d) Disease onset: moderate DR')
-    sns.kdeplot(binary_entropy(probs_bcnn), binary_entropy(probs_gp),
-                n_levels=250, ax=ax224)
+    kde2d_plot(binary_entropy(probs_bcnn), binary_entropy(probs_gp),
+               n_levels=250, ax=ax224)
     ax224.set_ylabel('GP uncertainty [$H(p_{GP})$]')
     ax224.set_xlabel('BCNN uncertainty [$H(\mu_{pred})$]')
 
@@ -958,9 +1168,12 @@ def class_conditional_uncertainty(y, uncertainty, disease_onset,
     plt.figure(figsize=(FIGURE_WIDTH / 2.0, FIGURE_WIDTH / 2.0))
     plt.title('Disease onset: {}'.format(disease_onset))
     HEALTHY, DISEASED = 0, 1
+    colors = sns.color_palette()
 
-    sns.distplot(uncertainty[y == HEALTHY], label='healthy')
-    sns.distplot(uncertainty[y == DISEASED], label='diseased')
+    for k, label in [(HEALTHY, 'healthy'), (DISEASED, 'diseased')]:
+        sns.distplot(uncertainty[y == k], kde=False, norm_hist=True,
+                     color=colors[k], label=label)
+        kde_plot(uncertainty[y == k], shade=False, color=colors[k])
     plt.xlabel('model uncertainty')
     plt.ylabel('density')
     plt.legend(loc='best')
@@ -977,54 +1190,75 @@ def resize_and_save(figures, size_inches, format='.pdf'):
         fig.savefig(name + format)
 
 
+def save_figures(figures, format='.pdf'):
+    """Write figures (dict of name: figure) to name + format and close them
+
+    Returns
+    =======
+
+    list of the names of the figures
+
+    """
+    assert isinstance(figures, dict)
+    for name, fig in figures.iteritems():
+        fig.savefig(name + format)
+        # pyplot keeps references to all open figures
+        plt.close(fig)
+    return figures.keys()
+
+
 def main():
+    """Save all figures, each one is written exactly once
+
+    Returns
+    =======
+
+    list of the names of the figures
 
+    """
     figures = []
 
     config = CONFIG['BCNN_mildDR_Kaggle']
 
-    y = load_labels(config['LABELS_FILE'])
     images = load_filenames(config['LABELS_FILE'])
-    probs, probs_mc = load_predictions(config['predictions'])
-    y_bin, probs_bin, probs_mc_bin = detection_task(
-        y, probs, probs_mc, config['disease_onset'])
-    pred_mean, pred_std = posterior_statistics(probs_mc_bin)
+    y, y_bin, probs_bin, probs_mc_bin, pred_mean, pred_std = \
+        get_task('BCNN_mildDR_Kaggle')
     uncertainties = {'$\sigma_{pred}$': pred_std}
 
     f = fig1(y_bin, pred_mean, images, pred_std, probs_mc_bin,
-             y, config, label='$\sigma_{pred}$', save=True, format='.svg')
-    figures.append(f)
+             y, config, label='$\sigma_{pred}$', save=False)
+    figures += save_figures(f, format='.svg')
 
     f = bayes_vs_softmax()
-    figures.append(f)
+    figures += save_figures(f)
 
     f = acc_rejection_figure(y_bin, pred_mean, uncertainties, config,
-                             save=True, format='.pdf')
-    figures.append(f)
+                             save=False)
+    figures += save_figures(f)
 
     # ROC figure for comparison of different architectures, tasks
     # and true generalization performance
 
     f = roc_auc_figure()
-    figures.append(f)
+    figures += save_figures(f)
 
     f = level_figure()
-    figures.append(f)
+    figures += save_figures(f)
 
     f = label_disagreement_figure()
-    figures.append(f)
+    figures += save_figures(f)
 
     f = sigma_vs_mu()
-    figures.append(f)
+    figures += save_figures(f)
 
     f = gp_figure()
-    figures.append(f)
+    figures += save_figures(f)
 
-    f = train_test_generalization()
-    figures.append(f)
+    f = train_test_generalization(save=False)
+    figures += save_figures(f)
 
     return figures
 
 
 if __name__ == '__main__':
-    figures = main()
+    main()
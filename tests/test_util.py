@@ -1,6 +1,16 @@
 import unittest
+import numpy as np
 from numpy.random import randint
+from sklearn.metrics import average_precision_score
+from sklearn.metrics import roc_auc_score
 from util import quadratic_weighted_kappa
+from util import roc_auc_batched
+from util import roc_auc_prefixes
+from util import bootstrap_batched
+from util import rowwise
+from util import bandwidth_scott
+from util import gaussian_kde_fft
+from util import gaussian_kde2d_fft
 from ref_quadratic_weighted_kappa import quadratic_weighted_kappa as ref_quadratic_weighted_kappa
 from numpy.testing import assert_almost_equal
 
@@ -18,5 +28,148 @@ class TestQuadraticWeightedKappa(unittest.TestCase):
         assert_almost_equal(my_kappa, test, 7)
 
 
+class TestRocAucBatched(unittest.TestCase):
+
+    def test_roc_auc_batched(self):
+        n_batch, size = 20, 50
+        y_true = randint(2, size=size)
+        # rounding introduces ties
+        y_score = np.round(np.random.rand(n_batch, size), 1)
+
+        aucs = roc_auc_batched(y_true, y_score)
+        test = [roc_auc_score(y_true, s) for s in y_score]
+
+        assert_almost_equal(aucs, test, 7)
+
+    def test_roc_auc_prefixes(self):
+        size = 200
+        y_true = randint(2, size=size)
+        y_score = np.round(np.random.rand(size), 1)
+        cuts = np.array([50, 50, 120, 121, 200])
+
+        aucs = roc_auc_prefixes(y_true, y_score, cuts)
+        test = [roc_auc_score(y_true[:cut], y_score[:cut]) for cut in cuts]
+
+        assert_almost_equal(aucs, test, 7)
+
+
+class TestBootstrapBatched(unittest.TestCase):
+
+    def draw(self, seed, size, n_resamples, n_draws):
+        return np.random.RandomState(seed).randint(0, size,
+                                                   (n_resamples, n_draws),
+                                                   dtype=np.int32)
+
+    def test_bootstrap_batched(self):
+        size, n_resamples = 100, 200
+        y_true = np.tile([0, 1], size // 2)
+        y_score = np.random.rand(size)
+
+        # max_elements forces several batches of 3 resamples
+        low, high = bootstrap_batched([y_true, y_score], roc_auc_batched,
+                                      n_resamples=n_resamples,
+                                      max_elements=3 * size,
+                                      random_state=np.random.RandomState(0))
+        values = [roc_auc_score(y_true[i], y_score[i])
+                  for i in self.draw(0, size, n_resamples, size)]
+        test = np.percentile(values, [2.5, 97.5])
+
+        assert_almost_equal([low, high], test, 7)
+
+    def test_bootstrap_batched_n_draws(self):
+        size, n_resamples, n_draws = 100, 200, 20
+        data = np.random.rand(size)
+
+        low, high = bootstrap_batched([data], lambda x: x.mean(axis=1),
+                                      n_resamples=n_resamples, alpha=0.1,
+                                      random_state=np.random.RandomState(0),
+                                      n_draws=n_draws)
+        values = data[self.draw(0, size, n_resamples, n_draws)].mean(axis=1)
+        test = np.percentile(values, [5, 95])
+
+        assert_almost_equal([low, high], test, 7)
+
+    def test_bootstrap_batched_single_class(self):
+        size, n_resamples, n_draws = 10, 200, 4
+        y_true = np.array([1] + [0] * (size - 1))
+        y_score = np.random.rand(size)
+
+        low, high = bootstrap_batched([y_true, y_score], roc_auc_batched,
+                                      n_resamples=n_resamples,
+                                      random_state=np.random.RandomState(0),
+                                      n_draws=n_draws)
+        # resamples without a positive have no auc and are discarded
+        idx = self.draw(0, size, n_resamples, n_draws)
+        values = [roc_auc_score(y_true[i], y_score[i])
+                  for i in idx if 0 < y_true[i].sum() < n_draws]
+        test = np.percentile(values, [2.5, 97.5])
+
+        self.assertLess(len(values), n_resamples)
+        assert_almost_equal([low, high], test, 7)
+
+
+class TestRowwise(unittest.TestCase):
+
+    def test_rowwise(self):
+        n_batch, size = 20, 50
+        y_true = np.tile([0, 1], (n_batch, size // 2))
+        y_score = np.random.rand(n_batch, size)
+
+        values = rowwise(average_precision_score)(y_true, y_score)
+        test = [average_precision_score(y, s) for y, s in zip(y_true,
+                                                               y_score)]
+
+        assert_almost_equal(values, test, 7)
+
+    def test_rowwise_bootstrap_n_draws(self):
+        size, n_resamples, n_draws = 100, 50, 30
+        y_true = np.tile([0, 1], size // 2)
+        y_score = np.random.rand(size)
+
+        low, high = bootstrap_batched([y_true, y_score],
+                                      rowwise(average_precision_score),
+                                      n_resamples=n_resamples,
+                                      random_state=0, n_draws=n_draws)
+        idx = np.random.RandomState(0).randint(0, size,
+                                               (n_resamples, n_draws),
+                                               dtype=np.int32)
+        values = [average_precision_score(y_true[i], y_score[i])
+                  for i in idx]
+        test = np.percentile(values, [2.5, 97.5])
+
+        assert_almost_equal([low, high], test, 7)
+
+
+class TestGaussianKdeFft(unittest.TestCase):
+
+    def test_gaussian_kde_fft(self):
+        data = np.random.randn(1000)
+
+        grid, density = gaussian_kde_fft(data, n_grid=512)
+        bw = bandwidth_scott(data)
+        test = np.exp(-0.5 * ((grid[:, np.newaxis] - data) / bw) ** 2)
+        test = test.sum(axis=1) / (len(data) * bw * np.sqrt(2 * np.pi))
+
+        assert_almost_equal(density, test, 2)
+        assert_almost_equal(density.sum() * (grid[1] - grid[0]), 1.0, 3)
+
+    def test_gaussian_kde2d_fft(self):
+        x = np.random.randn(500)
+        y = 0.5 * x + np.random.rand(500)
+
+        grid_x, grid_y, density = gaussian_kde2d_fft(x, y, n_grid=64)
+
+        def kernel(grid, data):
+            bw = bandwidth_scott(data)
+            return np.exp(-0.5 * ((grid[:, np.newaxis] - data) / bw) ** 2) / \
+                (bw * np.sqrt(2 * np.pi))
+
+        test = kernel(grid_x, x).dot(kernel(grid_y, y).T) / len(x)
+        cell = (grid_x[1] - grid_x[0]) * (grid_y[1] - grid_y[0])
+
+        assert_almost_equal(density, test, 2)
+        assert_almost_equal(density.sum() * cell, 1.0, 3)
+
+
 if __name__ == '__main__':
     unittest.main()
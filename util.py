@@ -7,8 +7,11 @@ import numpy as np
 import bokeh.plotting as bp
 import bokeh.client as bc
 from scipy import interpolate
+from scipy.signal import fftconvolve
+from scipy.stats import rankdata
 import seaborn as sns
 from sklearn.metrics import roc_curve, roc_auc_score
+from sklearn.utils import check_random_state
 import keras.callbacks
 from keras import backend as K
 
@@ -368,8 +371,8 @@ def roc_curve_plot(y_true, y_score, pos_label=1,
 
     plt.plot(fdr, tdr, color=color,
              label=legend, linewidth=2)
-    plt.fill_between(fdr, interpolate_high(fdr), tdr, color=color, alpha=0.3)
-    plt.fill_between(fdr, tdr, interpolate_low(fdr), color=color, alpha=0.3)
+    plt.fill_between(fdr, interpolate_low(fdr), interpolate_high(fdr),
+                     color=color, alpha=0.3)
     plt.plot([0, 1], [0, 1], 'k--')
     if recommendation:
         plt.scatter([0.05], [0.8], color='g', s=50,
@@ -417,6 +420,250 @@ def bootstrap(data, fun, n_resamples=10000, alpha=0.05):
     return low, high
 
 
+def roc_auc_batched(y_true, y_score):
+    """Compute the area under the ROC curve for a batch of score vectors
+
+    Vectorized equivalent of sklearn.metrics.roc_auc_score via the
+    Mann-Whitney U statistic, tied scores are assigned their average rank.
+
+    Parameters
+    ==========
+
+    y_true : array, shape = [n_samples] or [n_batch, n_samples]
+        True binary labels in {0, 1}. A 1D array is shared by all rows of
+        y_score.
+
+    y_score : array, shape = [n_batch, n_samples]
+        Target scores, one row per evaluation.
+
+    Returns
+    =======
+
+    auc : array, shape = [n_batch]
+        nan for rows where only one class is present
+
+    """
+    y_score = np.atleast_2d(y_score)
+    y_true = np.broadcast_to(y_true, y_score.shape)
+    n_batch, n_samples = y_score.shape
+
+    rows = np.arange(n_batch)[:, np.newaxis]
+    order = np.argsort(y_score, axis=1, kind='mergesort')
+    score_sorted = y_score[rows, order]
+    y_sorted = y_true[rows, order] == 1
+
+    # average rank of each group of tied scores
+    pos = np.broadcast_to(np.arange(n_samples), y_score.shape)
+    tie_start = np.ones(y_score.shape, dtype=bool)
+    tie_start[:, 1:] = score_sorted[:, 1:] != score_sorted[:, :-1]
+    tie_end = np.ones(y_score.shape, dtype=bool)
+    tie_end[:, :-1] = tie_start[:, 1:]
+    first = np.maximum.accumulate(np.where(tie_start, pos, 0), axis=1)
+    last = np.minimum.accumulate(
+        np.where(tie_end, pos, n_samples - 1)[:, ::-1], axis=1)[:, ::-1]
+    ranks = (first + last) / 2.0 + 1
+
+    n_pos = y_sorted.sum(axis=1)
+    n_neg = n_samples - n_pos
+    rank_sum = (ranks * y_sorted).sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (rank_sum - n_pos * (n_pos + 1) / 2.0) / (n_pos * n_neg)
+
+
+def roc_auc_prefixes(y_true, y_score, cuts):
+    """Compute the area under the ROC curve of growing prefixes of the data
+
+    Equivalent to [roc_auc_score(y_true[:cut], y_score[:cut]) for cut in
+    cuts], but the Mann-Whitney U statistic is updated incrementally: only
+    pairs involving the samples added since the previous cut are counted,
+    against sorted arrays of the scores seen so far.
+
+    Parameters
+    ==========
+
+    y_true : array, shape = [n_samples]
+        True binary labels in {0, 1}.
+
+    y_score : array, shape = [n_samples]
+
+    cuts : array of int, non-decreasing prefix lengths
+
+    Returns
+    =======
+
+    auc : array, shape = [len(cuts)]
+        nan for prefixes where only one class is present
+
+    """
+    y_true = np.asarray(y_true) == 1
+    y_score = np.asarray(y_score)
+    seen_pos = np.array([], dtype=y_score.dtype)
+    seen_neg = np.array([], dtype=y_score.dtype)
+    u_stat = 0.0
+    auc = np.empty((len(cuts),))
+    start = 0
+    for i, stop in enumerate(cuts):
+        pos = np.sort(y_score[start:stop][y_true[start:stop]])
+        neg = np.sort(y_score[start:stop][~y_true[start:stop]])
+
+        # pairs within the new samples
+        ranks = rankdata(y_score[start:stop])
+        u_stat += ranks[y_true[start:stop]].sum() - \
+            len(pos) * (len(pos) + 1) / 2
+        # new positives against negatives seen so far and vice versa
+        left = np.searchsorted(seen_neg, pos, side='left')
+        right = np.searchsorted(seen_neg, pos, side='right')
+        u_stat += (left + right).sum() / 2
+        left = np.searchsorted(seen_pos, neg, side='left')
+        right = np.searchsorted(seen_pos, neg, side='right')
+        u_stat += (2 * len(seen_pos) - left - right).sum() / 2
+
+        seen_pos = np.insert(seen_pos, np.searchsorted(seen_pos, pos), pos)
+        seen_neg = np.insert(seen_neg, np.searchsorted(seen_neg, neg), neg)
+        start = stop
+
+        n_pairs = len(seen_pos) * len(seen_neg)
+        auc[i] = u_stat / n_pairs if n_pairs > 0 else np.nan
+
+    return auc
+
+
+def bootstrap_batched(data, fun, n_resamples=10000, alpha=0.05,
+                      max_elements=2 ** 22, random_state=None, n_draws=None):
+    """Compute confidence interval for values of vectorized function fun
+
+    Unlike bootstrap, fun is evaluated on whole batches of resamples: every
+    element of data is indexed with an (n_batch, n_samples) index array and
+    fun has to return one value per row (see roc_auc_batched). Resamples
+    for which fun is undefined (nan) are discarded.
+
+    Parameters
+    ==========
+    data: list of arguments to fun
+    max_elements: upper bound for the size of the index array of one batch
+    random_state: None, int or np.random.RandomState used to draw resamples
+    n_draws: size of every resample, len(data[0]) by default
+
+    Returns
+    =======
+    low, high: lower and upper bound of the (1 - alpha) confidence interval
+
+    """
+    assert isinstance(data, list)
+    n_samples = len(data[0])
+    if n_draws is None:
+        n_draws = n_samples
+    batch_size = max(1, max_elements // n_draws)
+    rng = check_random_state(random_state)
+    dtype = np.int32 if n_samples < np.iinfo(np.int32).max else np.int64
+
+    values = np.empty((n_resamples,))
+    for start in range(0, n_resamples, batch_size):
+        stop = min(start + batch_size, n_resamples)
+        idx = rng.randint(0, n_samples, (stop - start, n_draws),
+                          dtype=dtype)
+        values[start:stop] = fun(*[d[idx] for d in data])
+
+    values = values[~np.isnan(values)]
+    low, high = np.percentile(values, [100 * alpha / 2.0,
+                                       100 * (1 - alpha / 2.0)])
+
+    return low, high
+
+
+def rowwise(fun):
+    """Turn fun of 1D arrays into a batched function for bootstrap_batched
+
+    The returned function evaluates fun on the rows of its 2D arguments one
+    after the other. Only use it if no vectorized version of fun exists.
+
+    """
+    def batched(*data):
+        return np.array([fun(*row) for row in zip(*data)], dtype=np.float64)
+    return batched
+
+
+def bandwidth_scott(data):
+    """Scott's rule of thumb bandwidth for a gaussian kernel
+
+    1.059 * min(std, IQR / 1.349) * n ** (-1 / 5) with the population std,
+    which alone is used if the IQR vanishes.
+
+    """
+    iqr = np.subtract(*np.percentile(data, [75, 25]))
+    scale = min(data.std(), iqr / 1.349) if iqr > 0 else data.std()
+    return 1.059 * scale * len(data) ** (-1 / 5)
+
+
+def _gaussian_kernel(bw, dx, n_grid):
+    # a kernel wider than the grid never contributes beyond its edges
+    half = min(int(np.ceil(4 * bw / dx)), n_grid - 1)
+    x = np.arange(-half, half + 1) * dx
+    return np.exp(-0.5 * (x / bw) ** 2) / (np.sqrt(2 * np.pi) * bw)
+
+
+def _kde_grid(data, cut):
+    bw = bandwidth_scott(data)
+    assert bw > 0, 'Bandwidth has to be positive, is data constant?'
+    return bw, (data.min() - cut * bw, data.max() + cut * bw)
+
+
+def gaussian_kde_fft(data, n_grid=512, cut=3):
+    """Gaussian kernel density estimate on a regular grid
+
+    The data are binned into a histogram that is convolved with the kernel
+    via FFT, which costs O(n + n_grid log n_grid) instead of the
+    O(n * n_grid) of a direct evaluation.
+
+    Parameters
+    ==========
+    data: array, shape = [n_samples]
+    n_grid: number of grid points
+    cut: the grid extends cut bandwidths beyond the extreme data points
+
+    Returns
+    =======
+    grid, density: arrays, shape = [n_grid]
+
+    """
+    data = np.asarray(data, dtype=np.float64)
+    bw, support = _kde_grid(data, cut)
+    hist, edges = np.histogram(data, bins=n_grid, range=support)
+    dx = edges[1] - edges[0]
+    density = fftconvolve(hist, _gaussian_kernel(bw, dx, n_grid),
+                          mode='same') / len(data)
+    grid = (edges[:-1] + edges[1:]) / 2
+    return grid, np.maximum(density, 0)
+
+
+def gaussian_kde2d_fft(x, y, n_grid=128, cut=3):
+    """Bivariate gaussian kernel density estimate on a regular grid
+
+    Two dimensional version of gaussian_kde_fft with independent bandwidths
+    per dimension.
+
+    Returns
+    =======
+    grid_x, grid_y: arrays, shape = [n_grid]
+    density: array, shape = [n_grid, n_grid], density[i, j] belongs to
+        (grid_x[i], grid_y[j])
+
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    bw_x, support_x = _kde_grid(x, cut)
+    bw_y, support_y = _kde_grid(y, cut)
+    hist, edges_x, edges_y = np.histogram2d(x, y, bins=n_grid,
+                                            range=[support_x, support_y])
+    kernel = np.outer(
+        _gaussian_kernel(bw_x, edges_x[1] - edges_x[0], n_grid),
+        _gaussian_kernel(bw_y, edges_y[1] - edges_y[0], n_grid))
+    density = fftconvolve(hist, kernel, mode='same') / len(x)
+    grid_x = (edges_x[:-1] + edges_x[1:]) / 2
+    grid_y = (edges_y[:-1] + edges_y[1:]) / 2
+    return grid_x, grid_y, np.maximum(density, 0)
+
+
 def balance_classes(y, data=None):
     """Balance classes via undersampling"""
     assert isinstance(data, list), \